@@ -1,5 +1,7 @@
+import signal
 import socket
 import struct
+import sys
 import threading
 import time
 
@@ -15,59 +17,206 @@ def print_rr_table(rr_table):
         print(f'{r["record_no"]},{r["name"]},{r["type"]},{r["result"]},{ttl},{1 if r["static"] else 0}')
     print("")
 
+def check_type(type_name):
+    if type_name not in TYPE_MAP:
+        raise ValueError(f"unknown record type {type_name!r}, expected one of {list(TYPE_MAP)}")
+
+def load_zone_file(path):
+    """Read (name, type, result) tuples from a zone file, one "name,type,result" per line."""
+    records = []
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = [p.strip() for p in line.split(",", 2)]
+            if len(fields) != 3:
+                raise ValueError(f"{path}:{line_no}: expected name,type,result")
+            try:
+                check_type(fields[1])
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_no}: {e}") from None
+            records.append(tuple(fields))
+    return records
+
 class AmazoneServer:
-    def __init__(self):
+    def __init__(self, port=AMAZONE_PORT):
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock.bind(('0.0.0.0', AMAZONE_PORT))
-        self.rr_table = []
+        self.sock.bind(('0.0.0.0', port))
+        self.port = self.sock.getsockname()[1]
+        self.closed = False
+        # (name, type) -> record; queries read it without locking, writers hold self.lock
+        self.zone = {}
         self.record_counter = 0
+        # changes made while a reload is building, replayed onto the new zone before the swap
+        self.pending_changes = None
+        self.lock = threading.Lock()
+        self.reload_lock = threading.RLock()
         # seed some static records for amazone domain
-        self.rr_table.append({
-            "record_no": self.record_counter,
-            "name": "shop.amazone.com",
-            "type": "A",
-            "result": "3.33.147.88",
-            "ttl": None,
-            "static": True
-        })
-        self.rr_table.append({
+        self.add_record("shop.amazone.com", "A", "3.33.147.88")
+        self.add_record("cloud.amazone.com", "A", "15.197.140.28")
+
+    @property
+    def rr_table(self):
+        """Snapshot of the zone's records as a tuple; change the zone through add/update/delete_record."""
+        with self.lock:
+            return tuple(self.zone.values())
+
+    def lookup(self, name, type_name):
+        return self.zone.get((name, type_name))
+
+    def add_record(self, name, type_name, result):
+        """Add a new record; returns False if (name, type) already exists, use update_record for that."""
+        check_type(type_name)
+        with self.lock:
+            if (name, type_name) in self.zone:
+                return False
+            self._apply(self._put, name, type_name, result)
+            return True
+
+    def update_record(self, name, type_name, result):
+        check_type(type_name)
+        with self.lock:
+            if (name, type_name) not in self.zone:
+                return False
+            self._apply(self._put, name, type_name, result)
+            return True
+
+    def delete_record(self, name, type_name):
+        with self.lock:
+            if (name, type_name) not in self.zone:
+                return False
+            self._apply(self._delete, name, type_name)
+            return True
+
+    def _apply(self, change, *args):
+        # caller holds self.lock and has checked that the change succeeds on the live zone
+        if self.pending_changes is not None:
+            self.pending_changes.append((change, args))
+        change(self.zone, *args)
+
+    def _put(self, zone, name, type_name, result):
+        old = zone.get((name, type_name))
+        if old is not None:
+            # replace rather than mutate so a concurrent query never sees a half-updated record
+            zone[(name, type_name)] = dict(old, result=result)
+            return
+        zone[(name, type_name)] = {
             "record_no": self.record_counter,
-            "name": "cloud.amazone.com",
-            "type": "A",
-            "result": "15.197.140.28",
+            "name": name,
+            "type": type_name,
+            "result": result,
             "ttl": None,
             "static": True
-        })
+        }
         self.record_counter += 1
 
+    def _delete(self, zone, name, type_name):
+        zone.pop((name, type_name), None)
+
+    def reload(self, records):
+        """Build a new zone from (name, type, result) tuples and swap it in.
+
+        Queries keep being answered from the old zone until the swap.
+        Incremental changes that succeed while the new zone is being
+        built are replayed onto it before the swap: adds and updates as
+        upserts, deletes as deletes. So every add/update/delete_record
+        call that returned True is reflected in the new zone, and calls
+        that returned False leave it untouched. If any record has an
+        unknown type, ValueError is raised and the current zone is kept.
+        """
+        with self.reload_lock:
+            with self.lock:
+                self.pending_changes = []
+            try:
+                zone = {}
+                for name, type_name, result in records:
+                    check_type(type_name)
+                    old = zone.get((name, type_name))
+                    zone[(name, type_name)] = {
+                        "record_no": len(zone) if old is None else old["record_no"],
+                        "name": name,
+                        "type": type_name,
+                        "result": result,
+                        "ttl": None,
+                        "static": True
+                    }
+                with self.lock:
+                    self.record_counter = len(zone)
+                    for change, args in self.pending_changes:
+                        change(zone, *args)
+                    old_zone, self.zone = self.zone, zone
+            finally:
+                with self.lock:
+                    self.pending_changes = None
+            print(f"[amazone] Zone reloaded ({len(zone)} records)")
+        # free the old zone a piece at a time; one large deallocation would hold up queries
+        while old_zone:
+            old_zone.popitem()
+
+    def reload_file(self, path):
+        # parse under reload_lock too, so overlapping reloads cannot swap an older parse over a newer one
+        with self.reload_lock:
+            self.reload(load_zone_file(path))
+
+    def reload_async(self, records):
+        return self._start_reload(self.reload, records)
+
+    def reload_file_async(self, path):
+        return self._start_reload(self.reload_file, path)
+
+    def _start_reload(self, target, arg):
+        def run():
+            try:
+                target(arg)
+            except (OSError, ValueError) as e:
+                print(f"[amazone] Zone reload failed, keeping current zone: {e}")
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        self.closed = True
+        try:
+            # wakes a listen() blocked in recvfrom, which closing alone does not do on Linux
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
     def listen(self):
-        print("[amazone] Listening on port", AMAZONE_PORT)
-        while True:
-            data, addr = self.sock.recvfrom(4096)
-            if not data:
-                continue
-            txid, flags = struct.unpack("!IB", data[:5])
-            if flags == 0:
-                qtype = data[5]
-                name_len = struct.unpack("!H", data[6:8])[0]
-                name = data[8:8+name_len].decode('utf-8')
-                print(f"[amazone] Received query for {name} type {qtype} from {addr}")
-                # check rr table
-                answer = None
-                for r in self.rr_table:
-                    if r["name"] == name and r["type"] == TYPE_MAP_REV.get(qtype, str(qtype)):
-                        answer = r
-                        break
-                if answer:
-                    # send response back
-                    self._send_response(txid, addr, answer["name"], TYPE_MAP[answer["type"]], 60, answer["result"])
-                    print("[amazone] Sent response (from local RR):")
-                    print_rr_table(self.rr_table)
-                else:
-                    # not found
-                    self._send_response(txid, addr, name, qtype, 0, "Record not found")
-                    print("[amazone] Record not found - responded NOT FOUND")
-            # ignore if flags==1 (shouldn't happen)
+        print("[amazone] Listening on port", self.port)
+        while not self.closed:
+            try:
+                data, addr = self.sock.recvfrom(4096)
+                if not data:
+                    continue
+                self._handle_message(data, addr)
+            except OSError:
+                if not self.closed:
+                    raise
+        print("[amazone] Socket closed, stopping listener")
+
+    def _handle_message(self, data, addr):
+        txid, flags = struct.unpack("!IB", data[:5])
+        if flags == 0:
+            qtype = data[5]
+            name_len = struct.unpack("!H", data[6:8])[0]
+            name = data[8:8+name_len].decode('utf-8')
+            print(f"[amazone] Received query for {name} type {qtype} from {addr}")
+            # check rr table
+            answer = self.lookup(name, TYPE_MAP_REV.get(qtype, str(qtype)))
+            if answer:
+                # send response back
+                self._send_response(txid, addr, answer["name"], TYPE_MAP[answer["type"]], 60, answer["result"])
+                print("[amazone] Sent response (from local RR):")
+                print_rr_table([answer])
+            else:
+                # not found
+                self._send_response(txid, addr, name, qtype, 0, "Record not found")
+                print("[amazone] Record not found - responded NOT FOUND")
+        # ignore if flags==1 (shouldn't happen)
 
     def _send_response(self, txid, addr, name, atype, ttl, result):
         name_b = name.encode('utf-8')
@@ -79,8 +228,14 @@ class AmazoneServer:
 
 def main():
     server = AmazoneServer()
+    if len(sys.argv) > 1:
+        zone_path = sys.argv[1]
+        server.reload_file(zone_path)
+        if hasattr(signal, "SIGHUP"):
+            # SIGHUP re-reads the zone file on a side thread without stopping the listener
+            signal.signal(signal.SIGHUP, lambda signum, frame: server.reload_file_async(zone_path))
     server.listen()
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
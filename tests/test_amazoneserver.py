@@ -0,0 +1,197 @@
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from amazoneserver import AmazoneServer, TYPE_MAP, load_zone_file
+
+@pytest.fixture
+def server():
+    server = AmazoneServer(port=0)
+    listener = threading.Thread(target=server.listen, daemon=True)
+    listener.start()
+    server.listener = listener
+    yield server
+    server.close()
+    listener.join(timeout=2)
+    assert not listener.is_alive()
+
+def query(server, txid, name, qtype=TYPE_MAP["A"]):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(2)
+    try:
+        name_b = name.encode("utf-8")
+        msg = struct.pack("!IBB H", txid, 0, qtype, len(name_b)) + name_b
+        sock.sendto(msg, ("127.0.0.1", server.port))
+        data, _ = sock.recvfrom(4096)
+    finally:
+        sock.close()
+    rtxid = struct.unpack("!I", data[:4])[0]
+    name_len = struct.unpack("!H", data[6:8])[0]
+    p = 8 + name_len + 4
+    res_len = struct.unpack("!H", data[p:p + 2])[0]
+    return rtxid, data[p + 2:p + 2 + res_len].decode("utf-8")
+
+def test_seeded_records(server):
+    assert server.lookup("shop.amazone.com", "A")["result"] == "3.33.147.88"
+    assert server.lookup("cloud.amazone.com", "A")["result"] == "15.197.140.28"
+    assert [r["record_no"] for r in server.rr_table] == [0, 1]
+
+def test_add_update_delete(server):
+    server.add_record("mail.amazone.com", "A", "1.2.3.4")
+    assert query(server, 1, "mail.amazone.com") == (1, "1.2.3.4")
+
+    assert server.update_record("mail.amazone.com", "A", "5.6.7.8")
+    assert query(server, 2, "mail.amazone.com") == (2, "5.6.7.8")
+
+    assert server.delete_record("mail.amazone.com", "A")
+    assert query(server, 3, "mail.amazone.com") == (3, "Record not found")
+
+    assert not server.update_record("mail.amazone.com", "A", "9.9.9.9")
+    assert not server.delete_record("mail.amazone.com", "A")
+
+def test_add_existing_record_rejected(server):
+    assert not server.add_record("shop.amazone.com", "A", "1.1.1.1")
+    assert server.lookup("shop.amazone.com", "A") == {"record_no": 0, "name": "shop.amazone.com", "type": "A",
+                                                      "result": "3.33.147.88", "ttl": None, "static": True}
+    assert server.update_record("shop.amazone.com", "A", "1.1.1.1")
+    assert server.lookup("shop.amazone.com", "A")["record_no"] == 0
+
+def test_rr_table_is_read_only_snapshot(server):
+    with pytest.raises(AttributeError):
+        server.rr_table.append({})
+    assert len(server.rr_table) == 2
+
+def test_unknown_type_rejected(server):
+    with pytest.raises(ValueError):
+        server.add_record("mx.amazone.com", "15", "mail")
+    with pytest.raises(ValueError):
+        server.update_record("shop.amazone.com", "MX", "mail")
+    with pytest.raises(ValueError):
+        server.reload([("shop.amazone.com", "A", "1.1.1.1"), ("mx.amazone.com", "15", "mail")])
+
+    assert server.lookup("shop.amazone.com", "A")["result"] == "3.33.147.88"
+    assert query(server, 1, "mx.amazone.com", qtype=15) == (1, "Record not found")
+    assert server.listener.is_alive()
+
+def test_load_zone_file(tmp_path):
+    path = tmp_path / "amazone.zone"
+    path.write_text("# comment\nshop.amazone.com,A,1.1.1.1\n\nshop.amazone.com,AAAA,::1\n")
+    assert load_zone_file(path) == [("shop.amazone.com", "A", "1.1.1.1"),
+                                    ("shop.amazone.com", "AAAA", "::1")]
+
+    path.write_text("shop.amazone.com,A,1.1.1.1\nmx.amazone.com,MX,mail\n")
+    with pytest.raises(ValueError, match=":2:"):
+        load_zone_file(path)
+
+    path.write_text("shop.amazone.com\n")
+    with pytest.raises(ValueError, match=":1:"):
+        load_zone_file(path)
+
+def test_failed_file_reload_keeps_zone(server, tmp_path, capsys):
+    path = tmp_path / "amazone.zone"
+    path.write_text("mx.amazone.com,MX,mail\n")
+    server.reload_file_async(path).join()
+    server.reload_file_async(tmp_path / "missing.zone").join()
+
+    assert capsys.readouterr().out.count("Zone reload failed, keeping current zone") == 2
+    assert server.lookup("shop.amazone.com", "A")["result"] == "3.33.147.88"
+
+def test_reload_renumbers_duplicates(server):
+    server.reload([("a.amazone.com", "A", "1.1.1.1"),
+                   ("a.amazone.com", "A", "1.1.1.2"),
+                   ("b.amazone.com", "A", "2.2.2.2")])
+    server.add_record("c.amazone.com", "A", "3.3.3.3")
+
+    assert [r["record_no"] for r in server.rr_table] == [0, 1, 2]
+    assert server.lookup("a.amazone.com", "A")["result"] == "1.1.1.2"
+
+def test_changes_during_reload_are_kept(server):
+    def records():
+        yield ("shop.amazone.com", "A", "3.33.147.88")
+        yield ("cloud.amazone.com", "A", "15.197.140.28")
+        # incremental changes land while the new zone is still being built
+        server.add_record("mail.amazone.com", "A", "1.2.3.4")
+        server.update_record("cloud.amazone.com", "A", "5.6.7.8")
+        server.delete_record("shop.amazone.com", "A")
+        yield ("www.amazone.com", "A", "9.9.9.9")
+
+    server.reload(records())
+
+    assert server.lookup("mail.amazone.com", "A")["result"] == "1.2.3.4"
+    assert server.lookup("cloud.amazone.com", "A")["result"] == "5.6.7.8"
+    assert server.lookup("shop.amazone.com", "A") is None
+    assert server.lookup("www.amazone.com", "A")["result"] == "9.9.9.9"
+    record_nos = [r["record_no"] for r in server.rr_table]
+    assert len(set(record_nos)) == len(record_nos)
+
+def test_failed_changes_during_reload_do_not_touch_new_zone(server):
+    results = {}
+
+    def records():
+        yield ("new.amazone.com", "A", "1.1.1.1")
+        yield ("gone.amazone.com", "A", "2.2.2.2")
+        yield ("shop.amazone.com", "A", "3.3.3.3")
+        # none of these exist in the live zone, or already exist there, so all fail
+        results["update"] = server.update_record("new.amazone.com", "A", "9.9.9.9")
+        results["delete"] = server.delete_record("gone.amazone.com", "A")
+        results["add"] = server.add_record("shop.amazone.com", "A", "9.9.9.9")
+
+    server.reload(records())
+
+    assert results == {"update": False, "delete": False, "add": False}
+    assert server.lookup("new.amazone.com", "A")["result"] == "1.1.1.1"
+    assert server.lookup("gone.amazone.com", "A")["result"] == "2.2.2.2"
+    assert server.lookup("shop.amazone.com", "A")["result"] == "3.3.3.3"
+
+def test_acknowledged_changes_survive_reload_without_the_record(server):
+    results = {}
+
+    def records():
+        yield ("www.amazone.com", "A", "1.1.1.1")
+        yield ("mail.amazone.com", "A", "2.2.2.2")
+        # shop and cloud are live but missing from the new zone; mail is new to both
+        results["update"] = server.update_record("shop.amazone.com", "A", "9.9.9.9")
+        results["delete"] = server.delete_record("cloud.amazone.com", "A")
+        results["add"] = server.add_record("mail.amazone.com", "A", "8.8.8.8")
+
+    server.reload(records())
+
+    assert results == {"update": True, "delete": True, "add": True}
+    assert server.lookup("shop.amazone.com", "A")["result"] == "9.9.9.9"
+    assert server.lookup("cloud.amazone.com", "A") is None
+    assert server.lookup("mail.amazone.com", "A")["result"] == "8.8.8.8"
+    assert server.lookup("www.amazone.com", "A")["result"] == "1.1.1.1"
+    record_nos = [r["record_no"] for r in server.rr_table]
+    assert len(set(record_nos)) == len(record_nos)
+
+def test_reload_does_not_drop_queries(server):
+    def zone(generation):
+        records = [(f"host{i}.amazone.com", "A", f"10.{generation}.{i // 256 % 256}.{i % 256}")
+                   for i in range(1_000_000)]
+        records.append(("shop.amazone.com", "A", "3.33.147.88"))
+        return records
+
+    # start from a full zone so the old one is freed during the measured reload too
+    server.reload(zone(0))
+    reload_start = time.perf_counter()
+    reload_thread = server.reload_async(zone(1))
+    answers = []
+    worst = 0
+    txid = 0
+    while reload_thread.is_alive() or txid < 20:
+        start = time.perf_counter()
+        answers.append(query(server, txid, "shop.amazone.com"))
+        worst = max(worst, time.perf_counter() - start)
+        txid += 1
+    reload_thread.join()
+    reload_time = time.perf_counter() - reload_start
+
+    assert answers == [(i, "3.33.147.88") for i in range(txid)]
+    # a reload that blocked serving would hold a query for about the whole reload
+    assert worst < reload_time / 2
+    assert len(server.rr_table) == 1_000_001
+    assert query(server, txid, "host999999.amazone.com") == (txid, "10.1.66.63")
+    assert query(server, txid + 1, "cloud.amazone.com") == (txid + 1, "Record not found")